@@ -1,13 +1,22 @@
+import functools
 import json
+import multiprocessing
 import os
 import platform
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Collection, Iterable, Optional, Set, Tuple, Union
 
 import pandas as pd
 from weasyprint import HTML, CSS
-from jinja2 import Template
+from jinja2 import Environment, FileSystemLoader, Template
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -16,6 +25,22 @@ TEMPLATES_DIR = BASE_DIR / "templates"
 OUTPUT_DIR = BASE_DIR / "output"
 FONTS_DIR = BASE_DIR / "fonts"
 
+# Сколько строк CSV читать за один раз при поиске выбранных записей
+CSV_CHUNKSIZE = 10000
+
+# Поля, в которых обычно хранится invoice id
+INVOICE_KEY_CANDIDATES = [
+    "invoice_id",
+    "invoiceId",
+    "invoice",
+    "invoice_no",
+    "invoice_number",
+    "id",
+]
+
+# Записи: DataFrame из CSV или список словарей из JSON
+Records = Union[pd.DataFrame, List[Dict[str, Any]]]
+
 
 def ensure_directories() -> None:
     """
@@ -71,14 +96,76 @@ def choose_index(count: int, prompt: str) -> int:
         print("Неверный выбор, попробуйте снова.")
 
 
-def load_records_from_csv(path: Path) -> List[Dict[str, Any]]:
-    df = pd.read_csv(path)
-    return df.to_dict(orient="records")
+def _csv_column_types(dtype: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Колонки с invoice id всегда читаются как строки; остальные типы
+    определяет pandas (шаблоны считают, например, price * qty).
+    Через dtype можно явно задать типы других колонок.
+    """
+    column_types: Dict[str, Any] = {key: str for key in INVOICE_KEY_CANDIDATES}
+    if dtype:
+        column_types.update(dtype)
+    return column_types
+
+
+def load_frame_from_csv(
+    path: Path,
+    dtype: Optional[Dict[str, Any]] = None,
+    usecols: Optional[List[str]] = None,
+    nrows: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Прочитать CSV в DataFrame. Данные остаются в колоночном виде,
+    поэтому уникальные invoice id считаются средствами pandas.
+    usecols и nrows позволяют не читать файл целиком.
+    """
+    return pd.read_csv(
+        path,
+        dtype=_csv_column_types(dtype),
+        engine="c",
+        usecols=usecols,
+        nrows=nrows,
+    )
+
+
+def load_csv_rows(
+    path: Path, row_labels: Iterable[int], dtype: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Прочитать CSV по частям и вернуть в порядке файла только строки
+    с указанными номерами. В памяти одновременно не больше одной части.
+    """
+    wanted = set(row_labels)
+    rows: List[Dict[str, Any]] = []
+    if not wanted:
+        return rows
+
+    with pd.read_csv(
+        path,
+        chunksize=CSV_CHUNKSIZE,
+        dtype=_csv_column_types(dtype),
+        engine="c",
+    ) as reader:
+        for chunk in reader:
+            selected = chunk[chunk.index.isin(wanted)]
+            rows.extend(selected.to_dict(orient="records"))
+            if len(rows) == len(wanted):
+                break
+    return rows
 
 
 def load_records_from_json(path: Path) -> List[Dict[str, Any]]:
-    with path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+    if ORJSON_AVAILABLE:
+        # orjson разбирает UTF-8 сам, без текстового декодера Python
+        raw = path.read_bytes()
+        try:
+            data = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # orjson строже json: NaN, Infinity и целые шире 64 бит разбирает только json
+            data = json.loads(raw)
+    else:
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
 
     # Допускаем несколько распространённых структур
     if isinstance(data, list):
@@ -102,42 +189,63 @@ def load_records_from_json(path: Path) -> List[Dict[str, Any]]:
     return norm_records
 
 
-def detect_invoice_column(records: List[Dict[str, Any]]) -> Optional[str]:
+def _collect_keys(records: Records) -> Set[str]:
     """
-    Попробовать угадать колонку с invoice id.
+    Собрать все поля, встречающиеся в записях, за один проход.
     """
-    if not records:
-        return None
+    if isinstance(records, pd.DataFrame):
+        return set(records.columns)
+
+    keys: Set[str] = set()
+    for rec in records:
+        keys.update(rec)
+    return keys
 
-    candidate_keys = [
-        "invoice_id",
-        "invoiceId",
-        "invoice",
-        "invoice_no",
-        "invoice_number",
-        "id",
-    ]
 
-    keys = set().union(*(r.keys() for r in records))
-    for key in candidate_keys:
+def _match_invoice_key(keys: Collection[str]) -> Optional[str]:
+    """
+    Вернуть первое поле из INVOICE_KEY_CANDIDATES, найденное среди keys.
+    """
+    for key in INVOICE_KEY_CANDIDATES:
         if key in keys:
             return key
     return None
 
 
-def choose_invoice_column(records: List[Dict[str, Any]]) -> str:
+def _first_record_keys(records: Records) -> Collection[str]:
+    """
+    Поля первой записи. Обычно у всех записей одна схема, и их достаточно.
+    """
+    if isinstance(records, pd.DataFrame):
+        return records.columns
+    return records[0]
+
+
+def detect_invoice_column(records: Records) -> Optional[str]:
+    """
+    Попробовать угадать колонку с invoice id.
+    """
+    if len(records) == 0:
+        return None
+
+    return _match_invoice_key(_first_record_keys(records)) or _match_invoice_key(
+        _collect_keys(records)
+    )
+
+
+def choose_invoice_column(records: Records) -> str:
     """
     Определить колонку для invoice id, спрашивая пользователя при необходимости.
     """
+    if len(records) == 0:
+        raise ValueError("Нет записей в файле данных.")
+
     auto = detect_invoice_column(records)
     if auto:
         return auto
 
     # Попросим пользователя выбрать
-    if not records:
-        raise ValueError("Нет записей в файле данных.")
-
-    all_keys = sorted(set().union(*(r.keys() for r in records)))
+    all_keys = sorted(_collect_keys(records))
     if not all_keys:
         raise ValueError("В данных нет полей для выбора invoice id.")
 
@@ -146,20 +254,42 @@ def choose_invoice_column(records: List[Dict[str, Any]]) -> str:
     return all_keys[idx]
 
 
-def list_invoices(records: List[Dict[str, Any]], invoice_key: str) -> List[Any]:
+def list_invoices(
+    records: Records, invoice_key: str
+) -> Tuple[List[Any], Dict[Any, Any]]:
     """
-    Вернуть список уникальных invoice id в порядке появления.
+    Вернуть список уникальных invoice id в порядке появления и индекс
+    invoice id -> первая запись (для DataFrame - метка строки).
     """
-    seen = set()
-    result = []
+    if isinstance(records, pd.DataFrame):
+        # drop_duplicates сохраняет порядок и работает без цикла на Python
+        first = records[invoice_key].dropna().drop_duplicates()
+        invoices = first.tolist()
+        return invoices, dict(zip(invoices, first.index))
+
+    index: Dict[Any, Dict[str, Any]] = {}
     for rec in records:
         value = rec.get(invoice_key)
         if value is None:
             continue
-        if value not in seen:
-            seen.add(value)
-            result.append(value)
-    return result
+        if value not in index:
+            index[value] = rec
+    return list(index), index
+
+
+def get_invoice_record(
+    records: Records, invoice_index: Dict[Any, Any], invoice: Any
+) -> Optional[Dict[str, Any]]:
+    """
+    Найти первую запись с указанным invoice id по индексу из list_invoices.
+    Для DataFrame в словарь превращается только найденная строка.
+    """
+    entry = invoice_index.get(invoice)
+    if entry is None:
+        return None
+    if isinstance(records, pd.DataFrame):
+        return records.loc[entry].to_dict()
+    return entry
 
 
 def open_pdf(path: Path) -> None:
@@ -179,10 +309,12 @@ def open_pdf(path: Path) -> None:
         print(f"Не удалось автоматически открыть PDF: {e}")
 
 
+@functools.lru_cache(maxsize=1)
 def build_font_css() -> Optional[CSS]:
     """
     Построить CSS с подключением кириллического шрифта, если он есть.
     Ожидается файл fonts/DejaVuSans.ttf или fonts/Roboto-Regular.ttf.
+    Результат кэшируется: шрифты не меняются во время работы скрипта.
     """
     font_files = [
         FONTS_DIR / "DejaVuSans.ttf",
@@ -217,9 +349,26 @@ body {{
     return CSS(string=css_string)
 
 
+# Окружение Jinja2 кэширует скомпилированные шаблоны; при повторном рендере
+# проверяется только mtime файла, изменённый шаблон перечитывается
+_jinja_env = Environment(
+    loader=FileSystemLoader(str(TEMPLATES_DIR), encoding="utf-8"),
+    auto_reload=True,
+    cache_size=-1,
+)
+
+
 def render_template(template_path: Path, context: Dict[str, Any]) -> str:
-    html_text = template_path.read_text(encoding="utf-8")
-    template = Template(html_text)
+    """
+    Шаблоны из TEMPLATES_DIR берутся из кэша окружения Jinja2,
+    шаблоны из других мест компилируются при каждом вызове.
+    """
+    try:
+        name = template_path.resolve().relative_to(TEMPLATES_DIR.resolve()).as_posix()
+    except ValueError:
+        template = Template(template_path.read_text(encoding="utf-8"))
+    else:
+        template = _jinja_env.get_template(name)
     return template.render(**context)
 
 
@@ -235,6 +384,49 @@ def generate_pdf(html_content: str, output_path: Path) -> None:
     )
 
 
+def invoice_output_path(invoice: Any) -> Path:
+    safe_invoice = str(invoice).replace(os.sep, "_")
+    return OUTPUT_DIR / f"invoice_{safe_invoice}.pdf"
+
+
+def generate_pdfs_batch(
+    records: Records,
+    template_path: Path,
+    invoice_key: str,
+    max_workers: Optional[int] = None,
+) -> List[Path]:
+    """
+    Сгенерировать PDF для каждого invoice id из записей.
+    HTML рендерится в текущем процессе, а WeasyPrint запускается
+    параллельно в отдельных процессах.
+    """
+    invoices, invoice_index = list_invoices(records, invoice_key)
+
+    jobs = []
+    for invoice in invoices:
+        rec = get_invoice_record(records, invoice_index, invoice)
+        html_content = render_template(template_path, rec)
+        jobs.append((html_content, invoice_output_path(invoice)))
+
+    output_paths = [path for _, path in jobs]
+    workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        for html_content, output_path in jobs:
+            generate_pdf(html_content, output_path)
+        return output_paths
+
+    # spawn одинаково работает на Windows, macOS и Linux
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [
+            pool.submit(generate_pdf, html_content, output_path)
+            for html_content, output_path in jobs
+        ]
+        for future in futures:
+            future.result()
+    return output_paths
+
+
 def main() -> None:
     ensure_directories()
 
@@ -267,33 +459,54 @@ def main() -> None:
 
     # Читаем данные
     print(f"\nЧитаю данные из: {data_file.name}")
-    if data_file.suffix.lower() == ".csv":
-        records = load_records_from_csv(data_file)
+    records: Records
+    is_csv = data_file.suffix.lower() == ".csv"
+    if is_csv:
+        # Для выбора колонки invoice id достаточно первой строки
+        records = load_frame_from_csv(data_file, nrows=1)
     elif data_file.suffix.lower() == ".json":
         records = load_records_from_json(data_file)
     else:
         print("Неподдерживаемый формат файла данных.")
         return
 
-    if not records:
+    if len(records) == 0:
         print("Файл данных не содержит записей.")
         return
 
     # Определяем колонку с invoice id
     invoice_key = choose_invoice_column(records)
-    invoices = list_invoices(records, invoice_key)
+    if is_csv:
+        # Целиком читаем только колонку invoice id; индекс хранит номера строк
+        records = load_frame_from_csv(data_file, usecols=[invoice_key])
+    invoices, invoice_index = list_invoices(records, invoice_key)
     if not invoices:
         print(f"Не удалось найти ни одного значения '{invoice_key}' в данных.")
         return
 
     # Меню выбора конкретного invoice
     invoice_options = [str(inv) for inv in invoices]
+    invoice_options.append("Все чеки")
     print_menu(f"Доступные чеки (по полю '{invoice_key}')", invoice_options)
-    invoice_idx = choose_index(len(invoices), "Выберите invoice id")
+    invoice_idx = choose_index(len(invoice_options), "Выберите invoice id")
+
+    if invoice_idx == len(invoices):
+        print(f"\nИспользую шаблон: {template_file.name}")
+        print(f"Генерирую {len(invoices)} PDF в {OUTPUT_DIR}")
+        if is_csv:
+            records = load_csv_rows(data_file, invoice_index.values())
+        for output_path in generate_pdfs_batch(records, template_file, invoice_key):
+            print(f"PDF успешно сохранён: {output_path}")
+        return
+
     chosen_invoice = invoices[invoice_idx]
 
     # Ищем запись по выбранному invoice
-    record = next((r for r in records if r.get(invoice_key) == chosen_invoice), None)
+    if is_csv:
+        rows = load_csv_rows(data_file, [invoice_index[chosen_invoice]])
+        record = rows[0] if rows else None
+    else:
+        record = get_invoice_record(records, invoice_index, chosen_invoice)
     if not record:
         print("Не удалось найти запись для выбранного invoice.")
         return
@@ -303,8 +516,7 @@ def main() -> None:
     html_content = render_template(template_file, record)
 
     # Генерируем и открываем PDF
-    safe_invoice = str(chosen_invoice).replace(os.sep, "_")
-    output_path = OUTPUT_DIR / f"invoice_{safe_invoice}.pdf"
+    output_path = invoice_output_path(chosen_invoice)
     print(f"Генерирую PDF: {output_path}")
     generate_pdf(html_content, output_path)
     print(f"PDF успешно сохранён: {output_path}")
@@ -2,25 +2,50 @@
 # 🧠 password_manager.py
 
 import os
+import base64
+import binascii
+import time
 import sqlite3
 import hashlib
+import hmac
 import secrets
 import string
 import getpass
-from cryptography.fernet import Fernet
+from cryptography.exceptions import InvalidSignature
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes, padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.hmac import HMAC
 
 
 DB_FILE = "passwords.db"
 KEY_FILE = ".key"
 
+# Параметры scrypt для мастер-пароля (n=2**15, r=8 требуют 32 МБ памяти)
+SCRYPT_N = 2 ** 15
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_MAXMEM = 64 * 1024 * 1024
+SCRYPT_PREFIX = "scrypt$"
+
+# Формат токена Fernet: версия | время (8 байт) | IV (16) | шифртекст | HMAC (32)
+FERNET_VERSION = 0x80
+
+# Алфавит для генерации паролей
+_ALPHABET = string.ascii_letters + string.digits + "!@#$%^&*()"
+
 
 # ==========================================================
 # DatabaseManager
 # ==========================================================
 class DatabaseManager:
     def __init__(self):
-        self.conn = sqlite3.connect(DB_FILE)
+        self.conn = sqlite3.connect(DB_FILE, cached_statements=256)
         self.conn.row_factory = sqlite3.Row
+        # WAL: commit не делает fsync всей БД на каждую операцию
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
         self.init_database()
 
     def init_database(self):
@@ -66,7 +91,18 @@ class DatabaseManager:
         row = self.get_master_password()
         if not row:
             return False
-        return self._hash_password(password, row["salt"]) == row["password_hash"]
+        if row["password_hash"].startswith(SCRYPT_PREFIX):
+            return hmac.compare_digest(
+                self._hash_password(password, row["salt"]), row["password_hash"]
+            )
+
+        # Старый формат (sha256): после успешной проверки переводим на scrypt
+        if not hmac.compare_digest(
+            self._legacy_hash_password(password, row["salt"]), row["password_hash"]
+        ):
+            return False
+        self.set_master_password(password)
+        return True
 
     # ---- passwords ----
     def add_password(self, name, login, encrypted_password):
@@ -94,6 +130,19 @@ class DatabaseManager:
 
     @staticmethod
     def _hash_password(password: str, salt: str) -> str:
+        digest = hashlib.scrypt(
+            password.encode(),
+            salt=bytes.fromhex(salt),
+            n=SCRYPT_N,
+            r=SCRYPT_R,
+            p=SCRYPT_P,
+            maxmem=SCRYPT_MAXMEM,
+            dklen=32,
+        )
+        return SCRYPT_PREFIX + digest.hex()
+
+    @staticmethod
+    def _legacy_hash_password(password: str, salt: str) -> str:
         return hashlib.sha256((password + salt).encode()).hexdigest()
 
 
@@ -110,13 +159,52 @@ class EncryptionManager:
             with open(KEY_FILE, "wb") as f:
                 f.write(self.key)
 
-        self.fernet = Fernet(self.key)
+        # Ключи Fernet разбираем один раз; HMAC-контекст копируется на каждую операцию
+        try:
+            raw_key = base64.urlsafe_b64decode(self.key)
+        except binascii.Error:
+            raw_key = b""
+        if len(raw_key) != 32:
+            raise ValueError(f"Ключ в {KEY_FILE} повреждён: нужен 32-байтовый ключ Fernet.")
+        self._encryption_key = raw_key[16:]
+        self._hmac = HMAC(raw_key[:16], hashes.SHA256())
 
     def encrypt(self, data: str) -> bytes:
-        return self.fernet.encrypt(data.encode())
+        # Токен Fernet без base64: в БД он хранится как BLOB
+        iv = os.urandom(16)
+        padder = padding.PKCS7(algorithms.AES.block_size).padder()
+        padded = padder.update(data.encode()) + padder.finalize()
+        encryptor = Cipher(algorithms.AES(self._encryption_key), modes.CBC(iv)).encryptor()
+        ciphertext = encryptor.update(padded) + encryptor.finalize()
+
+        timestamp = int(time.time()).to_bytes(8, "big")
+        basic = bytes([FERNET_VERSION]) + timestamp + iv + ciphertext
+        h = self._hmac.copy()
+        h.update(basic)
+        return basic + h.finalize()
 
     def decrypt(self, token: bytes) -> str:
-        return self.fernet.decrypt(token).decode()
+        # Старые записи хранят обычный токен Fernet в base64
+        if token[:1] != bytes([FERNET_VERSION]):
+            try:
+                token = base64.urlsafe_b64decode(token)
+            except (TypeError, binascii.Error):
+                raise InvalidToken
+        if len(token) < 57 or token[0] != FERNET_VERSION:
+            raise InvalidToken
+
+        h = self._hmac.copy()
+        h.update(token[:-32])
+        try:
+            h.verify(token[-32:])
+        except InvalidSignature:
+            raise InvalidToken
+
+        iv = token[9:25]
+        decryptor = Cipher(algorithms.AES(self._encryption_key), modes.CBC(iv)).decryptor()
+        padded = decryptor.update(token[25:-32]) + decryptor.finalize()
+        unpadder = padding.PKCS7(algorithms.AES.block_size).unpadder()
+        return (unpadder.update(padded) + unpadder.finalize()).decode()
 
 
 # ==========================================================
@@ -164,17 +252,20 @@ class PasswordGenerator:
 
     def generate_password_interactive(self):
         length = int(input("Длина (по умолчанию 16): ") or 16)
-
-        chars = (
-            string.ascii_lowercase +
-            string.ascii_uppercase +
-            string.digits +
-            "!@#$%^&*()"
-        )
-
-        password = "".join(secrets.choice(chars) for _ in range(length))
+        password = self._random_password(length, _ALPHABET)
         print("🔑 Новый пароль:", password)
 
+    @staticmethod
+    def _random_password(length: int, chars: str) -> str:
+        # Один блок случайных байт вместо secrets.choice на каждый символ.
+        # Байты >= limit отбрасываются, чтобы b % len(chars) не давал смещения.
+        limit = 256 - 256 % len(chars)
+        result = []
+        while len(result) < length:
+            raw = secrets.token_bytes((length - len(result)) * 2)
+            result.extend(chars[b % len(chars)] for b in raw if b < limit)
+        return "".join(result[:length])
+
     def get_password(self):
         name = input("Название: ")
         row = self.db.get_password(name)
@@ -2,15 +2,14 @@
 
 from __future__ import annotations
 
+import math
+
 
 def factorial(n: int) -> int:
     """Return n! for non-negative n."""
     if n < 0:
         raise ValueError("n must be non-negative")
-    result = 1
-    for i in range(2, n + 1):
-        result *= i
-    return result
+    return math.factorial(n)
 
 
 def main() -> None:
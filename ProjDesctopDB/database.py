@@ -1,6 +1,24 @@
 # database.py
 import sqlite3
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
+
+TIME_FORMAT = "%Y-%m-%d %H:%M"
+
+# Статус записей, дату которых не удалось перенести из старого формата
+INVALID_DATE_STATUS = "Неверная дата"
+
+# due_time хранится как Unix-время (секунды), сравнение - целых чисел
+REMINDERS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reminders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    description TEXT,
+    due_time INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL
+)
+"""
 
 
 class ReminderDatabase:
@@ -11,24 +29,72 @@ class ReminderDatabase:
 
     def initdatabase(self):
         cursor = self.conn.cursor()
+        cursor.execute(REMINDERS_SCHEMA)
+        self._migrate_due_time(cursor)
+        # Частичный индекс под выборку ожидающих напоминаний по времени
         cursor.execute("""
-        CREATE TABLE IF NOT EXISTS reminders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            description TEXT,
-            due_time TEXT NOT NULL,
-            status TEXT NOT NULL,
-            created_at TEXT NOT NULL
-        )
+        CREATE INDEX IF NOT EXISTS idx_reminders_pending
+        ON reminders(due_time) WHERE status='Ожидает'
         """)
         self.conn.commit()
 
+    def _migrate_due_time(self, cursor):
+        # Старые базы хранили due_time строкой "YYYY-MM-DD HH:MM" в местном времени
+        columns = {
+            row["name"]: row["type"]
+            for row in cursor.execute("PRAGMA table_info(reminders)")
+        }
+        if columns["due_time"] == "INTEGER":
+            return
+
+        # sqlite3 выполняет DDL вне неявной транзакции, поэтому
+        # пересборку таблицы оборачиваем в явную транзакцию
+        isolation_level = self.conn.isolation_level
+        self.conn.isolation_level = None
+        try:
+            cursor.execute("BEGIN")
+            rows = cursor.execute("SELECT * FROM reminders").fetchall()
+            cursor.execute("DROP INDEX IF EXISTS idx_reminders_pending")
+            cursor.execute("DROP TABLE reminders")
+            cursor.execute(REMINDERS_SCHEMA)
+            cursor.executemany("""
+            INSERT INTO reminders (id, title, description, due_time, status, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """, [self._convert_legacy_row(row) for row in rows])
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        finally:
+            self.conn.isolation_level = isolation_level
+
+    @staticmethod
+    def _convert_legacy_row(row):
+        description = row["description"]
+        status = row["status"]
+        try:
+            # Тот же разбор, которым GUI проверял ввод (допускает "2025-1-5 9:30")
+            due_time = int(datetime.strptime(row["due_time"], TIME_FORMAT).timestamp())
+        except (TypeError, ValueError):
+            # Запись не теряем: исходный текст даты переносим в описание,
+            # а статус меняем, чтобы напоминание не срабатывало
+            due_time = 0
+            status = INVALID_DATE_STATUS
+            original = f"Исходная дата: {row['due_time']}"
+            description = f"{description}\n\n{original}" if description else original
+        return (
+            row["id"], row["title"], description, due_time, status, row["created_at"],
+        )
+
     def add_reminder(self, title, description, due_time):
         cursor = self.conn.cursor()
         cursor.execute("""
         INSERT INTO reminders (title, description, due_time, status, created_at)
         VALUES (?, ?, ?, 'Ожидает', ?)
-        """, (title, description, due_time, self._now()))
+        """, (
+            title, description, int(due_time.timestamp()),
+            datetime.now().strftime(TIME_FORMAT),
+        ))
         self.conn.commit()
 
     def get_all_reminders(self):
@@ -36,12 +102,30 @@ class ReminderDatabase:
             "SELECT * FROM reminders ORDER BY due_time"
         ).fetchall()
 
+    def get_reminder_rows(self):
+        # Кортежи (id, title, due_time, status) в порядке колонок таблицы GUI,
+        # время уже отформатировано средствами SQLite
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        return cursor.execute("""
+        SELECT id, title,
+               strftime('%Y-%m-%d %H:%M', due_time, 'unixepoch', 'localtime'),
+               status
+        FROM reminders ORDER BY due_time
+        """).fetchall()
+
     def get_due_reminders(self):
         return self.conn.execute("""
         SELECT * FROM reminders
         WHERE status='Ожидает' AND due_time <= ?
         """, (self._now(),)).fetchall()
 
+    def get_next_due_time(self):
+        return self.conn.execute("""
+        SELECT MIN(due_time) FROM reminders
+        WHERE status='Ожидает'
+        """).fetchone()[0]
+
     def sort_by_due_time(self):
         return self.get_all_reminders()
 
@@ -52,12 +136,20 @@ class ReminderDatabase:
         """, (status, reminder_id))
         self.conn.commit()
 
+    def update_status_many(self, reminder_ids, status):
+        # Одна транзакция и один commit на все записи
+        self.conn.executemany("""
+        UPDATE reminders SET status=?
+        WHERE id=?
+        """, [(status, reminder_id) for reminder_id in reminder_ids])
+        self.conn.commit()
+
     def delete_reminder(self, reminder_id):
         self.conn.execute("DELETE FROM reminders WHERE id=?", (reminder_id,))
         self.conn.commit()
 
     def mark_overdue(self):
-        overdue_time = (datetime.now() - timedelta(minutes=1)).strftime("%Y-%m-%d %H:%M")
+        overdue_time = self._now() - 60
         self.conn.execute("""
         UPDATE reminders SET status='Просрочено'
         WHERE status='Ожидает' AND due_time < ?
@@ -77,6 +169,10 @@ class ReminderDatabase:
 
     @staticmethod
     def _now():
-        return datetime.now().strftime("%Y-%m-%d %H:%M")
+        return int(time.time())
+
+    @staticmethod
+    def format_due_time(due_time):
+        return datetime.fromtimestamp(due_time).strftime(TIME_FORMAT)
 
 
@@ -3,6 +3,8 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime, timedelta
 
+from database import TIME_FORMAT
+
 
 class ReminderGUI:
     def __init__(self, root, db, notifier):
@@ -48,30 +50,36 @@ class ReminderGUI:
 
     def refresh_reminders(self):
         self.tree.delete(*self.tree.get_children())
-        for r in self.db.get_all_reminders():
-            self.tree.insert("", "end", values=(
-                r["id"], r["title"], r["due_time"], r["status"]
-            ))
+        insert = self.tree.insert
+        for row in self.db.get_reminder_rows():
+            insert("", "end", iid=row[0], values=row)
 
     def add_reminder(self):
-        title = simple_input("Заголовок")
+        values = MultiFieldDialog(
+            self.root,
+            "Новое напоминание",
+            ["Заголовок", "Описание", "Дата и время (YYYY-MM-DD HH:MM)"],
+        ).show()
+        if not values:
+            return
+        title, desc, due = values.values()
         if not title:
             return
-        desc = simple_input("Описание")
-        due = simple_input("Дата и время (YYYY-MM-DD HH:MM)")
         try:
-            datetime.strptime(due, "%Y-%m-%d %H:%M")
+            due = datetime.strptime(due, TIME_FORMAT)
         except Exception:
             messagebox.showerror("Ошибка", "Неверный формат даты")
             return
 
         self.db.add_reminder(title, desc, due)
+        self.notifier.wake()
         self.refresh_reminders()
         self.update_status_bar()
 
     def set_quick_time(self, minutes):
-        due = (datetime.now() + timedelta(minutes=minutes)).strftime("%Y-%m-%d %H:%M")
+        due = datetime.now() + timedelta(minutes=minutes)
         self.db.add_reminder("Быстрое напоминание", "", due)
+        self.notifier.wake()
         self.refresh_reminders()
         self.update_status_bar()
 
@@ -92,7 +100,8 @@ class ReminderGUI:
         r = self.db.get_reminder_by_id(rid)
         messagebox.showinfo(
             "Детали",
-            f"{r['title']}\n\n{r['description']}\n\n{r['due_time']}"
+            f"{r['title']}\n\n{r['description']}\n\n"
+            f"{self.db.format_due_time(r['due_time'])}"
         )
 
     def on_closing(self):
@@ -101,14 +110,36 @@ class ReminderGUI:
             self.root.destroy()
 
 
-def simple_input(title):
-    win = tk.Toplevel()
-    win.title(title)
-    win.geometry("400x120")
-    value = tk.StringVar()
+class MultiFieldDialog:
+    """Одно окно с полем ввода на каждую подпись из fields."""
+
+    def __init__(self, parent, title, fields):
+        self.result = None
+        self.win = tk.Toplevel(parent)
+        self.win.title(title)
+        self.win.transient(parent)
+
+        self.values = {}
+        for row, field in enumerate(fields):
+            ttk.Label(self.win, text=field).grid(row=row, column=0, sticky="w", padx=10, pady=5)
+            value = tk.StringVar()
+            entry = ttk.Entry(self.win, textvariable=value, width=40)
+            entry.grid(row=row, column=1, sticky="ew", padx=10, pady=5)
+            if row == 0:
+                entry.focus_set()
+            self.values[field] = value
+        self.win.columnconfigure(1, weight=1)
+
+        ttk.Button(self.win, text="OK", command=self.on_ok).grid(
+            row=len(fields), column=0, columnspan=2, pady=10
+        )
+        self.win.bind("<Return>", lambda event: self.on_ok())
 
-    ttk.Entry(win, textvariable=value).pack(pady=10, padx=10, fill="x")
-    ttk.Button(win, text="OK", command=win.destroy).pack()
+    def on_ok(self):
+        self.result = {field: value.get() for field, value in self.values.items()}
+        self.win.destroy()
 
-    win.wait_window()
-    return value.get()
+    def show(self):
+        # Возвращает словарь {подпись: значение} или None, если окно закрыли
+        self.win.wait_window()
+        return self.result
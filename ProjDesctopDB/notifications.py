@@ -10,22 +10,37 @@ try:
 except ImportError:
     TOAST_AVAILABLE = False
 
+# Максимальная пауза между проверками, в секундах
+MAX_IDLE_SECONDS = 60
+
+
 class NotificationManager:
     def __init__(self, db):
         self.db = db
         self.running = True
+        self.wakeup = threading.Event()
         self.toast = ToastNotifier() if TOAST_AVAILABLE else None
         self.thread = threading.Thread(target=self._monitor, daemon=True)
         self.thread.start()
 
     def _monitor(self):
         while self.running:
+            self.wakeup.clear()
             self.db.mark_overdue()
             due = self.db.get_due_reminders()
             for r in due:
                 self._show_notification(r["title"], r["description"])
-                self.db.update_status(r["id"], "Просрочено")
-            time.sleep(1)
+            if due:
+                self.db.update_status_many([r["id"] for r in due], "Просрочено")
+            # Спим до ближайшего напоминания; wake() будит раньше
+            self.wakeup.wait(self._seconds_until_next_due())
+
+    def _seconds_until_next_due(self):
+        next_due = self.db.get_next_due_time()
+        if next_due is None:
+            return MAX_IDLE_SECONDS
+        delay = next_due - time.time()
+        return min(max(delay, 0), MAX_IDLE_SECONDS)
 
     def _show_notification(self, title, message):
         if self.toast:
@@ -54,5 +69,10 @@ class NotificationManager:
     def test_notification(self):
         self._show_notification("Тест", "Это тестовое уведомление")
 
+    def wake(self):
+        # Вызывать после изменения напоминаний, чтобы пересчитать паузу
+        self.wakeup.set()
+
     def stop(self):
         self.running = False
+        self.wakeup.set()